@@ -5,22 +5,199 @@ Runs behind NAT/firewall - initiates outbound WebSocket connection.
 """
 
 import asyncio
-import json
+import functools
+import hashlib
 import os
+import random
+import select
+import socket
+import struct
 import sys
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
 
 import aiohttp
+import orjson
+
+try:
+    import blake3  # Optional: SIMD-accelerated hashing, falls back to hashlib.blake2b
+except ImportError:
+    blake3 = None
+
+# aiohttp's own frame masking (its C extension when built), the same ws.send_bytes uses
+try:
+    from aiohttp._websocket.helpers import websocket_mask  # aiohttp >= 3.10
+except ImportError:
+    from aiohttp.http_websocket import _websocket_mask as websocket_mask
+
+
+# Binary batch frame header: download_id (raw UUID bytes), first chunk_num,
+# total_chunks, chunk count, byte offset of the first chunk; followed by one
+# length per chunk, then the chunk bytes
+BATCH_HEADER = struct.Struct('!16sIIIQ')
+CHUNK_LENGTH = struct.Struct('!I')
+
+# Default transport write-buffer high-water mark; sends pause above it until
+# the buffer drains below a quarter of it
+WRITE_BUFFER_HIGH_WATER = 8 * 1024 * 1024
+
+# Attempts per chunk batch before a parallel transfer is abandoned
+MAX_SEND_ATTEMPTS = 3
+
+# Seconds to wait for the server's resume_from reply to download_meta or file_complete
+RESUME_REPLY_TIMEOUT = 30
+
+# Times data the server reports missing after file_complete is re-sent before giving up
+MAX_RESEND_ROUNDS = 3
+
+# Minimum seconds between progress line updates
+PROGRESS_INTERVAL = 0.1
+
+# Seconds to wait for a data socket to become writable during sendfile
+SENDFILE_TIMEOUT = 30
+
+# Default SO_SNDBUF/SO_RCVBUF for WebSocket connections
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Bandwidth probe size and bounds for --auto-chunk
+PROBE_BYTES = 4 * 1024 * 1024
+MIN_AUTO_CHUNK_SIZE = 256 * 1024
+MAX_AUTO_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def json_dumps(obj) -> str:
+    """Serialize WebSocket control messages with orjson"""
+    return orjson.dumps(obj).decode()
+
+
+def hash_file(file_path, buffer_size: int = 1024 * 1024) -> str:
+    """Hash file contents as '<algorithm>:<hex digest>' for resume and dedup checks"""
+    if blake3:
+        hasher, algorithm = blake3.blake3(), 'blake3'
+    else:
+        hasher, algorithm = hashlib.blake2b(), 'blake2b'
+    
+    buffer = memoryview(bytearray(buffer_size))
+    with open(file_path, 'rb') as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(buffer[:n])
+    
+    return f"{algorithm}:{hasher.hexdigest()}"
+
+
+def tune_socket(sock, nodelay: bool, bufsize: int):
+    """Apply TCP tuning to a connection's socket"""
+    if sock is None:
+        return
+    
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(nodelay))
+    
+    # Larger kernel buffers keep high bandwidth-delay links full (0 keeps the OS default,
+    # which also leaves Linux buffer autotuning on)
+    if bufsize:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, bufsize)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, bufsize)
+
+
+@functools.lru_cache(maxsize=16)
+def ws_frame_length_header(length: int) -> bytes:
+    """Build a final, masked binary WebSocket frame header without the mask key.
+    
+    Cached, since every full batch of a transfer has the same length.
+    """
+    if length < 126:
+        return struct.pack('!BB', 0x82, 0x80 | length)
+    elif length < 1 << 16:
+        return struct.pack('!BBH', 0x82, 0x80 | 126, length)
+    else:
+        return struct.pack('!BBQ', 0x82, 0x80 | 127, length)
+
+
+def ws_frame_header(length: int, mask: bytes = bytes(4)) -> bytes:
+    """Build a frame header followed by its mask key.
+    
+    Client frames must be masked; the default all-zero key leaves the payload
+    as-is, so file bytes can go straight from the page cache to the socket.
+    """
+    return ws_frame_length_header(length) + mask
+
+
+def wait_writable(sock_fd: int):
+    """Block until a non-blocking socket can accept more data"""
+    if not select.select([], [sock_fd], [], SENDFILE_TIMEOUT)[1]:
+        raise TimeoutError("Timed out waiting for data socket")
+
+
+def sendfile_frame(sock_fd: int, prefix: bytes, file_fd: int, offset: int, count: int):
+    """Write prefix, then count bytes of file_fd from offset, to a socket (runs in the I/O threadpool)"""
+    view = memoryview(prefix)
+    while view:
+        try:
+            view = view[os.write(sock_fd, view):]
+        except BlockingIOError:
+            wait_writable(sock_fd)
+    
+    while count:
+        try:
+            sent = os.sendfile(sock_fd, file_fd, offset, count)
+        except BlockingIOError:
+            wait_writable(sock_fd)
+            continue
+        if not sent:
+            raise ConnectionError("File ended early during sendfile")
+        offset += sent
+        count -= sent
 
 
 class FileDownloadClient:
-    def __init__(self, server_url: str, client_id: str, chunk_size: int = 1024 * 1024):
+    def __init__(self, server_url: str, client_id: str, chunk_size: int = 1024 * 1024,
+                 batch_bytes: int = 8 * 1024 * 1024, compress: bool = False,
+                 flow_hwm: int = WRITE_BUFFER_HIGH_WATER, parallel: int = 1,
+                 show_progress: bool = True, use_sendfile: bool = False,
+                 nodelay: bool = True, sndbuf: int = SOCKET_BUFFER_SIZE, auto_chunk: bool = False):
         self.server_url = server_url
         self.client_id = client_id
         self.chunk_size = chunk_size  # 1MB chunks by default
+        self.auto_chunk = auto_chunk  # Size chunks from a bandwidth-delay estimate on connect
+        self.batch_bytes = batch_bytes  # Chunks coalesced per WebSocket message (8MB by default)
+        self.compress = compress  # Offer permessage-deflate; only worth it for compressible files
+        self.flow_hwm = flow_hwm  # Write-buffer high-water mark for send backpressure
+        # Data connections used for chunk batches, bounded by CPU cores
+        self.parallel = max(1, min(parallel, os.cpu_count() or 1))
+        self.show_progress = show_progress  # Print a throttled progress line while sending
+        # Zero-copy os.sendfile of chunk bytes on dedicated data streams (plain ws:// only)
+        self.use_sendfile = use_sendfile
+        self.nodelay = nodelay  # Disable Nagle; batching already happens at the application layer
+        self.sndbuf = sndbuf  # Socket send/receive buffer size in bytes
+        self.session = None  # Shared across reconnects, created in run()
         self.ws = None
+        self.data_streams = []  # Extra WebSocket connections when parallel > 1 or using sendfile
+        self.stream_locks = {}  # Held while writing to a data stream's socket directly: {ws: lock}
+        self.pong_waiters = {}  # Pending data stream pings: {ws: {payload: future}}
+        self.transfers = set()  # Running send tasks
+        self.resume_waiters = {}  # Pending resume_from replies: {download_id: future}
+        
+        # Control message dispatch: {message type: handler(data)}
+        self.message_handlers = {
+            'registered': self.handle_registered,
+            'download_request': self.start_download,
+            'resume_from': self.handle_resume_from,
+            'ping': self.handle_ping
+        }
         self.running = True
+        
+        # Small threadpool for disk reads so they don't block the event loop
+        self.io_executor = ThreadPoolExecutor(max_workers=4)
+        
+        # sendfile blocks a thread per data stream for a whole batch, so it gets its own pool
+        self.sendfile_executor = ThreadPoolExecutor(max_workers=self.parallel) if use_sendfile else None
     
     async def connect(self):
         """Establish WebSocket connection to server"""
@@ -30,16 +207,42 @@ class FileDownloadClient:
         print(f"Connecting to server: {ws_url}")
         print(f"Client ID: {self.client_id}")
         
-        session = aiohttp.ClientSession()
+        # sendfile bypasses the transport, so it cannot work through TLS
+        if self.use_sendfile and (ws_url.startswith('wss://') or not hasattr(os, 'sendfile')):
+            print("  sendfile needs a plain ws:// connection and os.sendfile, falling back to regular sends")
+            self.use_sendfile = False
+        
+        stream_readers = []
         
         try:
-            self.ws = await session.ws_connect(ws_url, heartbeat=30)
+            self.ws = await self.open_websocket(ws_url)
+            
+            # Probe before registering so no download request can arrive in between
+            if self.auto_chunk:
+                await self.negotiate_chunk_size()
             
             # Register with server
             await self.ws.send_json({
                 'type': 'register',
                 'client_id': self.client_id
-            })
+            }, dumps=json_dumps)
+            
+            # Open extra data connections that only carry chunk batches
+            if self.parallel > 1 or self.use_sendfile:
+                for _ in range(self.parallel):
+                    ws = await self.open_websocket(ws_url, data_stream=True)
+                    await ws.send_json({
+                        'type': 'register',
+                        'client_id': self.client_id,
+                        'stream_role': 'data',
+                        'parent_id': self.client_id
+                    }, dumps=json_dumps)
+                    self.data_streams.append(ws)
+                    self.stream_locks[ws] = asyncio.Lock()
+                    self.pong_waiters[ws] = {}
+                    stream_readers.append(asyncio.create_task(self.drain_data_stream(ws)))
+                
+                print(f"✓ Opened {self.parallel} data streams")
             
             print("✓ Connected to server")
             
@@ -50,9 +253,109 @@ class FileDownloadClient:
             print(f"✗ Connection failed: {e}")
         
         finally:
+            for task in stream_readers + list(self.transfers):
+                task.cancel()
+            for ws in self.data_streams:
+                # Waits for a cancelled sendfile to finish writing so the close frame can't interleave
+                async with self.stream_locks[ws]:
+                    await ws.close()
+            self.data_streams = []
+            self.stream_locks = {}
+            self.pong_waiters = {}
             if self.ws:
                 await self.ws.close()
-            await session.close()
+    
+    async def open_websocket(self, ws_url, data_stream=False):
+        """Open a WebSocket connection with the configured compression and flow control"""
+        # Data streams answer pings and close frames themselves (see drain_data_stream) and send
+        # no pings of their own, so nothing else writes to the socket while sendfile is using it
+        # compress=15 requests permessage-deflate with a 32KB window
+        ws = await self.session.ws_connect(
+            ws_url,
+            params={'max_msg_size': self.max_message_size()},
+            heartbeat=None if data_stream else 30,
+            autoping=not data_stream,
+            autoclose=not data_stream,
+            compress=15 if self.compress else 0
+        )
+        
+        # aiohttp waits for the transport to drain once it is paused above the high-water mark
+        transport = ws._writer.transport
+        transport.set_write_buffer_limits(high=self.flow_hwm, low=self.flow_hwm // 4)
+        tune_socket(transport.get_extra_info('socket'), self.nodelay, self.sndbuf)
+        
+        return ws
+    
+    def max_message_size(self) -> int:
+        """Upper bound on the size of one batch message, sent so the server can accept it"""
+        max_chunk = MAX_AUTO_CHUNK_SIZE if self.auto_chunk else self.chunk_size
+        min_chunk = MIN_AUTO_CHUNK_SIZE if self.auto_chunk else self.chunk_size
+        table_size = (self.batch_bytes // min_chunk + 1) * CHUNK_LENGTH.size
+        return max(BATCH_HEADER.size + table_size + self.batch_bytes + max_chunk, 2 * PROBE_BYTES)
+    
+    async def negotiate_chunk_size(self):
+        """Pick chunk_size as twice the bandwidth-delay product, from a small and a bulk probe"""
+        rtt, _ = await self.probe(0)
+        bulk_time, bulk_bytes = await self.probe(PROBE_BYTES)
+        
+        throughput = bulk_bytes / max(bulk_time - rtt, 1e-6)
+        chunk_size = int(2 * throughput * rtt)
+        chunk_size = min(max(chunk_size, MIN_AUTO_CHUNK_SIZE), MAX_AUTO_CHUNK_SIZE)
+        self.chunk_size = chunk_size - chunk_size % 4096  # Keep reads page-aligned
+        
+        print(f"  RTT {rtt * 1000:.1f}ms, ~{throughput / 1024 / 1024:.1f} MB/s, "
+              f"chunk size {self.chunk_size:,} bytes")
+    
+    async def probe(self, size: int):
+        """Time a ping_bulk round trip carrying about size bytes of padding.
+        
+        Returns the elapsed time and the number of payload bytes that crossed the wire.
+        """
+        message = json_dumps({'type': 'ping_bulk', 'padding': os.urandom(size // 2).hex()})
+        wire_bytes = len(message)
+        if self.ws.compress:
+            # permessage-deflate still shrinks random hex to about 57%, so count the deflated size
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            wire_bytes = len(compressor.compress(message.encode()) + compressor.flush())
+        
+        start = time.monotonic()
+        await self.ws.send_str(message)
+        
+        while True:
+            msg = await self.ws.receive()
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                raise ConnectionError("Connection closed during bandwidth probe")
+            if orjson.loads(msg.data).get('type') == 'pong_bulk':
+                return time.monotonic() - start, wire_bytes
+    
+    async def drain_data_stream(self, ws):
+        """Read from a data connection so pings, close and the registration ack are processed"""
+        waiters = self.pong_waiters[ws]
+        
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.PING:
+                    async with self.stream_locks[ws]:
+                        await ws.pong(msg.data)
+                
+                elif msg.type == aiohttp.WSMsgType.PONG:
+                    waiter = waiters.pop(msg.data, None)
+                    if waiter and not waiter.done():
+                        waiter.set_result(None)
+                
+                elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+        
+        finally:
+            # Nothing more will arrive on this stream; file_complete reports whatever it lost
+            for waiter in waiters.values():
+                if not waiter.done():
+                    waiter.set_result(None)
+            waiters.clear()
+        
+        # Iteration also stops at the server's close frame; answer it once the socket is free
+        async with self.stream_locks[ws]:
+            await ws.close()
     
     async def message_loop(self):
         """Listen for messages from server"""
@@ -61,17 +364,10 @@ class FileDownloadClient:
         try:
             async for msg in self.ws:
                 if msg.type == aiohttp.WSMsgType.TEXT:
-                    data = json.loads(msg.data)
-                    msg_type = data.get('type')
-                    
-                    if msg_type == 'registered':
-                        print(f"✓ {data.get('message')}")
-                    
-                    elif msg_type == 'download_request':
-                        await self.handle_download_request(data)
-                    
-                    elif msg_type == 'ping':
-                        await self.ws.send_json({'type': 'pong'})
+                    data = orjson.loads(msg.data)
+                    handler = self.message_handlers.get(data.get('type'))
+                    if handler:
+                        await handler(data)
                 
                 elif msg.type == aiohttp.WSMsgType.CLOSED:
                     print("Connection closed by server")
@@ -84,6 +380,29 @@ class FileDownloadClient:
         except Exception as e:
             print(f"Error in message loop: {e}")
     
+    async def handle_registered(self, data):
+        """Handle registration acknowledgement from server"""
+        print(f"✓ {data.get('message')}")
+    
+    async def start_download(self, data):
+        """Run a download request as a task so replies like resume_from keep being received"""
+        task = asyncio.create_task(self.handle_download_request(data))
+        self.transfers.add(task)
+        task.add_done_callback(self.transfers.discard)
+    
+    async def handle_resume_from(self, data):
+        """Hand the server's resume_from reply to the waiting transfer"""
+        waiter = self.resume_waiters.pop(data.get('download_id'), None)
+        if waiter and not waiter.done():
+            if data.get('error'):
+                waiter.set_exception(RuntimeError(f"Server rejected download: {data['error']}"))
+            else:
+                waiter.set_result(data)
+    
+    async def handle_ping(self, data):
+        """Answer an application-level ping"""
+        await self.ws.send_json({'type': 'pong'}, dumps=json_dumps)
+    
     async def handle_download_request(self, data):
         """Handle download request from server"""
         download_id = data.get('download_id')
@@ -107,80 +426,331 @@ class FileDownloadClient:
                 'type': 'error',
                 'download_id': download_id,
                 'message': str(e)
-            })
+            }, dumps=json_dumps)
+    
+    def read_batch(self, f, offset: int, buffer: memoryview, payload_start: int):
+        """Read chunks from f at offset into buffer after payload_start (runs in the I/O threadpool)"""
+        lengths = []
+        pos = payload_start
+        f.seek(offset)
+        
+        # Coalesce several chunks into a single binary message
+        while pos < len(buffer):
+            n = f.readinto(buffer[pos:pos + self.chunk_size])
+            if not n:
+                break
+            pos += n
+            lengths.append(n)
+        
+        return lengths
     
     async def send_file(self, download_id: str, file_path: str):
-        """Send file to server in chunks"""
+        """Send file to server in chunk batches, spread over the data streams"""
         file_path = Path(file_path)
         
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        file_size = file_path.stat().st_size
+        stat = file_path.stat()
+        file_size = stat.st_size
         total_chunks = (file_size + self.chunk_size - 1) // self.chunk_size
+        streams = self.data_streams or [self.ws]
         
         print(f"  File size: {file_size:,} bytes")
-        print(f"  Sending in {total_chunks} chunks of {self.chunk_size:,} bytes")
         
-        chunk_num = 0
-        bytes_sent = 0
+        loop = asyncio.get_running_loop()
+        file_hash = await loop.run_in_executor(self.io_executor, hash_file, file_path)
+        print(f"  Hash: {file_hash}")
+        
+        # Announce size and hash; the server replies with the offset to start from
+        # (the full size if it already has this file, or where a failed transfer stopped)
+        reply = await self.request_resume(download_id, {
+            'type': 'download_meta',
+            'download_id': download_id,
+            'size': file_size,
+            'total_chunks': total_chunks,
+            'chunk_size': self.chunk_size,
+            'hash': file_hash,
+            'mtime': stat.st_mtime
+        })
+        
+        start_offset = reply['offset']
+        if start_offset >= file_size:
+            # Nothing left to send (an identical file on the server, or an empty file)
+            if file_size:
+                print("  Server already has this file, skipping transfer")
+        elif start_offset:
+            print(f"  Resuming from byte {start_offset:,} (chunk {start_offset // self.chunk_size + 1})")
+        
+        for _ in range(MAX_RESEND_ROUNDS + 1):
+            # Byte ranges still to send: [start, end) pairs, all but the last on chunk boundaries
+            ranges = reply.get('missing') or [[reply['offset'], file_size]]
+            if reply['offset'] < file_size:
+                await self.send_ranges(download_id, file_path, file_size, total_chunks, ranges, streams)
+                await self.flush_data_streams()
+            
+            # Only the server's reply confirms the file: batches queued on a data stream that
+            # dropped are lost without an error, so it answers with the ranges it is missing
+            reply = await self.request_resume(download_id, {
+                'type': 'file_complete',
+                'download_id': download_id,
+                'total_size': file_size,
+                'total_chunks': total_chunks
+            })
+            
+            if reply['offset'] >= file_size:
+                print(f"✓ File sent successfully ({total_chunks} chunks, {file_size:,} bytes)")
+                return
+            
+            missing = sum(end - start for start, end in reply['missing'])
+            print(f"  Server is missing {missing:,} bytes in {len(reply['missing'])} range(s), re-sending")
+        
+        raise ConnectionError(f"Server still missing data after {MAX_RESEND_ROUNDS} re-sends")
+    
+    async def request_resume(self, download_id: str, message: dict) -> dict:
+        """Send a control message and wait for the server's resume_from reply to it"""
+        waiter = asyncio.get_running_loop().create_future()
+        self.resume_waiters[download_id] = waiter
+        await self.ws.send_json(message, dumps=json_dumps)
+        
+        try:
+            return await asyncio.wait_for(waiter, RESUME_REPLY_TIMEOUT)
+        finally:
+            self.resume_waiters.pop(download_id, None)
+    
+    async def send_ranges(self, download_id, file_path, file_size, total_chunks, ranges, streams):
+        """Send the chunks covering the given byte ranges in batches, spread over streams"""
+        chunks_per_batch = max(1, -(-self.batch_bytes // self.chunk_size))
+        
+        # (first chunk, chunk count) per batch, never crossing the end of a range
+        batch_list = []
+        for start, end in ranges:
+            first, last = start // self.chunk_size, min(-(-end // self.chunk_size), total_chunks)
+            batch_list.extend(
+                (first_chunk, min(chunks_per_batch, last - first_chunk))
+                for first_chunk in range(first, last, chunks_per_batch)
+            )
+        
+        chunk_count = sum(count for _, count in batch_list)
+        print(f"  Sending in {chunk_count} chunks of {self.chunk_size:,} bytes over {len(streams)} stream(s)")
+        
+        # Workers pull batches from a shared iterator, one worker per stream
+        batches = iter(batch_list)
+        progress = {'bytes': file_size - sum(end - start for start, end in ranges), 'printed_at': 0.0}
+        
+        await asyncio.gather(*(
+            self.send_batches(download_id, file_path, file_size, total_chunks,
+                              chunks_per_batch, batches, streams, index, progress)
+            for index in range(len(streams))
+        ))
+        
+        if self.show_progress:
+            print()  # New line after progress
+    
+    async def flush_data_streams(self):
+        """Wait until the server has handled every batch sent so far on the open data streams.
+        
+        The server answers a ping only after the messages queued before it on the same
+        connection, so a pong means those batches have been written.
+        """
+        loop = asyncio.get_running_loop()
+        waiters = []
+        
+        for ws in self.data_streams:
+            if ws.closed:
+                continue  # file_complete reports whatever it lost
+            
+            payload = os.urandom(8)
+            waiter = loop.create_future()
+            self.pong_waiters[ws][payload] = waiter
+            
+            try:
+                async with self.stream_locks[ws]:
+                    await ws.ping(payload)
+            except (ConnectionError, aiohttp.ClientError):
+                self.pong_waiters[ws].pop(payload, None)
+                continue
+            
+            waiters.append(waiter)
+        
+        if waiters:
+            await asyncio.wait(waiters, timeout=RESUME_REPLY_TIMEOUT)
+    
+    async def send_batches(self, download_id, file_path, file_size, total_chunks,
+                           chunks_per_batch, batches, streams, index, progress):
+        """Send batches from the shared iterator, preferring streams[index]"""
+        download_id_bytes = uuid.UUID(download_id).bytes
+        
+        # Reusable batch buffers: room for the header and a full length table, then the chunk bytes
+        payload_start = BATCH_HEADER.size + chunks_per_batch * CHUNK_LENGTH.size
+        buffer_size = payload_start + chunks_per_batch * self.chunk_size
+        
+        # Without compression, full batches are masked in place and handed straight to the
+        # transport, which may keep referencing a buffer until it is flushed (Python 3.12+;
+        # earlier transports copy what they can't send). Each write is
+        # followed by a drain, so at most flow_hwm bytes stay queued; with enough buffers in
+        # rotation to cover that, the oldest one has always left the transport before it is
+        # refilled. in_flight records the transport each buffer was last written to.
+        direct = not self.compress
+        buffer_count = -(-self.flow_hwm // buffer_size) + 1 if direct else 1
+        if not self.use_sendfile:
+            buffers = [bytearray(buffer_size) for _ in range(buffer_count)]
+        in_flight = [None] * buffer_count
+        slot = 0
+        last_transport = None
+        
+        loop = asyncio.get_running_loop()
         
         with open(file_path, 'rb') as f:
-            while True:
-                chunk = f.read(self.chunk_size)
-                if not chunk:
-                    break
+            for first_chunk, count in batches:
+                offset = first_chunk * self.chunk_size
                 
-                chunk_num += 1
-                bytes_sent += len(chunk)
-                
-                # Encode chunk as latin1 to preserve binary data in JSON
-                chunk_data = chunk.decode('latin1')
+                if self.use_sendfile:
+                    # Only the headers are built in user space; the kernel copies the chunk bytes
+                    # Every chunk is full-sized except possibly the file's last one
+                    batch_size = min(count * self.chunk_size, file_size - offset)
+                    lengths = [self.chunk_size] * (count - 1) + [batch_size - (count - 1) * self.chunk_size]
+                    prefix = BATCH_HEADER.pack(download_id_bytes, first_chunk + 1, total_chunks, count, offset)
+                    prefix += struct.pack(f'!{count}I', *lengths)
+                    
+                    await self.send_with_retry(
+                        lambda ws: self.sendfile_batch(ws, prefix, f, offset, batch_size), streams, index
+                    )
                 
-                await self.ws.send_json({
-                    'type': 'file_chunk',
-                    'download_id': download_id,
-                    'chunk_num': chunk_num,
-                    'total_chunks': total_chunks,
-                    'data': chunk_data
-                })
+                else:
+                    # Frames on another or a closing transport aren't covered by the drains above
+                    sent_on = in_flight[slot]
+                    if (sent_on and (sent_on is not last_transport or sent_on.is_closing())
+                            and sent_on.get_write_buffer_size()):
+                        raise ConnectionResetError("Connection lost while sending batch")
+                    
+                    buffer = memoryview(buffers[slot])
+                    lengths = await loop.run_in_executor(
+                        self.io_executor, self.read_batch, f, offset,
+                        buffer[:payload_start + count * self.chunk_size], payload_start
+                    )
+                    if not lengths:
+                        break
+                    
+                    # Pack the header and length table directly in front of the chunk bytes
+                    start = payload_start - BATCH_HEADER.size - len(lengths) * CHUNK_LENGTH.size
+                    BATCH_HEADER.pack_into(buffer, start, download_id_bytes, first_chunk + 1,
+                                           total_chunks, len(lengths), offset)
+                    struct.pack_into(f'!{len(lengths)}I', buffer, start + BATCH_HEADER.size, *lengths)
+                    
+                    batch_size = sum(lengths)
+                    frame = buffer[start:payload_start + batch_size]
+                    if direct and len(frame) == buffer_size:
+                        last_transport = await self.send_with_retry(
+                            lambda ws: self.send_masked_frame(ws, buffers[slot]), streams, index
+                        )
+                        in_flight[slot] = last_transport
+                        slot = (slot + 1) % buffer_count
+                    else:
+                        # A short final batch, or compressed: aiohttp masks its own copy
+                        await self.send_with_retry(lambda ws: ws.send_bytes(frame), streams, index)
                 
-                # Progress indicator
-                progress = (bytes_sent / file_size) * 100
-                print(f"\r  Progress: {progress:.1f}% ({bytes_sent:,}/{file_size:,} bytes)", end='')
+                progress['bytes'] += batch_size
                 
-                # Small delay to avoid overwhelming the connection
-                await asyncio.sleep(0.01)
+                # Progress indicator, throttled so stdout writes stay off the hot path
+                bytes_sent = progress['bytes']
+                now = time.monotonic()
+                if self.show_progress and (now - progress['printed_at'] >= PROGRESS_INTERVAL
+                                           or bytes_sent == file_size):
+                    progress['printed_at'] = now
+                    percent = (bytes_sent / file_size) * 100
+                    print(f"\r  Progress: {percent:.1f}% ({bytes_sent:,}/{file_size:,} bytes)", end='')
+    
+    async def sendfile_batch(self, ws, prefix: bytes, f, offset: int, count: int):
+        """Send one batch frame on a data stream, with the chunk bytes written by os.sendfile"""
+        transport = ws._writer.transport
         
-        print()  # New line after progress
+        async with self.stream_locks[ws]:
+            # Let aiohttp flush anything it buffered so our bytes don't interleave with it
+            while transport.get_write_buffer_size():
+                await asyncio.sleep(0.001)
+            
+            if transport.is_closing():
+                raise ConnectionResetError("Data stream is closed")
+            
+            sock_fd = transport.get_extra_info('socket').fileno()
+            frame_prefix = ws_frame_header(len(prefix) + count) + prefix
+            thread_future = self.sendfile_executor.submit(
+                sendfile_frame, sock_fd, frame_prefix, f.fileno(), offset, count
+            )
+            future = asyncio.wrap_future(thread_future)
+            
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # A running thread can't be interrupted; keep the stream locked until it stops writing
+                if not thread_future.cancel():
+                    await asyncio.wait([future])
+                raise
+    
+    async def send_masked_frame(self, ws, frame: bytearray):
+        """Mask frame in place and write it behind a cached header, returning the transport used"""
+        transport = ws._writer.transport
+        if transport.is_closing():
+            raise ConnectionResetError("Cannot write to closing transport")
         
-        # Send completion message
-        await self.ws.send_json({
-            'type': 'file_complete',
-            'download_id': download_id,
-            'total_size': file_size,
-            'total_chunks': chunk_num
-        })
+        # A fresh key per frame, as RFC 6455 requires for client frames
+        mask = os.urandom(4)
+        websocket_mask(mask, frame)
+        
+        # Two writes rather than writelines, which joins its arguments into a copy before
+        # Python 3.12 and doesn't pause the protocol above the high-water mark from 3.12 on.
+        # Unsent data is queued as a view of frame from 3.12, and copied before that.
+        transport.write(ws_frame_header(len(frame), mask))
+        transport.write(frame)
         
-        print(f"✓ File sent successfully ({chunk_num} chunks, {file_size:,} bytes)")
+        try:
+            # Wait out the --flow-hwm pause, as ws.send_bytes would
+            await ws._writer.protocol._drain_helper()
+        except ConnectionError:
+            # The queued frame was dropped with the connection; unmask it for the retry
+            websocket_mask(mask, frame)
+            raise
+        
+        return transport
+    
+    async def send_with_retry(self, send, streams, index):
+        """Send a batch with send(ws) and return its result, falling back to other open streams
+        with exponential backoff and jitter"""
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            open_streams = [ws for ws in streams[index:] + streams[:index] if not ws.closed]
+            if not open_streams:
+                raise ConnectionError("All data streams are closed")
+            
+            try:
+                return await send(open_streams[0])
+            except (ConnectionError, aiohttp.ClientError) as e:
+                if attempt == MAX_SEND_ATTEMPTS - 1:
+                    raise
+                delay = min(0.1 * 2 ** attempt, 2.0) * random.uniform(0.5, 1.5)
+                print(f"\n  Batch send failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
     
     async def run(self):
         """Run the client with automatic reconnection"""
         retry_delay = 5
         
-        while self.running:
-            try:
-                await self.connect()
-            except KeyboardInterrupt:
-                print("\n\nShutting down...")
-                self.running = False
-                break
-            except Exception as e:
-                print(f"Connection error: {e}")
-            
-            if self.running:
-                print(f"\nReconnecting in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
+        # One session for all reconnects keeps its connector and DNS cache;
+        # limit=0 so parallel data streams are not capped by the connection pool
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as self.session:
+            while self.running:
+                try:
+                    await self.connect()
+                except KeyboardInterrupt:
+                    print("\n\nShutting down...")
+                    self.running = False
+                    break
+                except Exception as e:
+                    print(f"Connection error: {e}")
+                
+                if self.running:
+                    print(f"\nReconnecting in {retry_delay} seconds...")
+                    await asyncio.sleep(retry_delay)
 
 
 def main():
@@ -201,13 +771,96 @@ def main():
         default=1024 * 1024,
         help='Chunk size in bytes (default: 1MB)'
     )
+    parser.add_argument(
+        '--auto-chunk',
+        action='store_true',
+        help='Pick the chunk size from a bandwidth-delay estimate on connect (256KB-16MB)'
+    )
+    parser.add_argument(
+        '--batch-bytes',
+        type=int,
+        default=8 * 1024 * 1024,
+        help='Bytes of chunks coalesced per WebSocket message (default: 8MB)'
+    )
+    parser.add_argument(
+        '--compress',
+        dest='compress',
+        action='store_true',
+        default=False,
+        help='Enable permessage-deflate for compressible files (e.g. SQL dumps, logs)'
+    )
+    parser.add_argument(
+        '--no-compress',
+        dest='compress',
+        action='store_false',
+        help='Disable permessage-deflate (default)'
+    )
+    parser.add_argument(
+        '--flow-hwm',
+        type=int,
+        default=WRITE_BUFFER_HIGH_WATER,
+        help='Write-buffer high-water mark in bytes for send backpressure (default: 8MB)'
+    )
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        help='Number of WebSocket data connections used per transfer, capped at CPU cores (default: 1)'
+    )
+    parser.add_argument(
+        '--progress',
+        dest='show_progress',
+        action='store_true',
+        default=True,
+        help='Print a progress line while sending (default)'
+    )
+    parser.add_argument(
+        '--no-progress',
+        dest='show_progress',
+        action='store_false',
+        help='Do not print progress while sending'
+    )
+    parser.add_argument(
+        '--sendfile',
+        dest='use_sendfile',
+        action='store_true',
+        help='Send chunk bytes with zero-copy os.sendfile on data streams (plain ws:// only, no TLS)'
+    )
+    parser.add_argument(
+        '--nodelay',
+        dest='nodelay',
+        action='store_true',
+        default=True,
+        help='Set TCP_NODELAY on connections (default)'
+    )
+    parser.add_argument(
+        '--no-nodelay',
+        dest='nodelay',
+        action='store_false',
+        help="Leave Nagle's algorithm enabled"
+    )
+    parser.add_argument(
+        '--sndbuf',
+        type=int,
+        default=SOCKET_BUFFER_SIZE,
+        help='Socket send/receive buffer size in bytes, 0 for the OS default (default: 4MB)'
+    )
     
     args = parser.parse_args()
     
     client = FileDownloadClient(
         server_url=args.server,
         client_id=args.client_id,
-        chunk_size=args.chunk_size
+        chunk_size=args.chunk_size,
+        batch_bytes=args.batch_bytes,
+        compress=args.compress,
+        flow_hwm=args.flow_hwm,
+        parallel=args.parallel,
+        show_progress=args.show_progress,
+        use_sendfile=args.use_sendfile,
+        nodelay=args.nodelay,
+        sndbuf=args.sndbuf,
+        auto_chunk=args.auto_chunk
     )
     
     try:
@@ -5,30 +5,136 @@ Supports both REST API and CLI for triggering downloads.
 """
 
 import asyncio
-import json
+import collections
 import os
+import socket
+import struct
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, OrderedDict
 
 import aiohttp
+import orjson
 from aiohttp import web
 import argparse
 
+try:
+    import uvloop  # Optional: faster libuv-based event loop on Linux/macOS
+except ImportError:
+    uvloop = None
+
+
+# Binary batch frame header: download_id (raw UUID bytes), first chunk_num,
+# total_chunks, chunk count, byte offset of the first chunk; followed by one
+# length per chunk, then the chunk bytes
+BATCH_HEADER = struct.Struct('!16sIIIQ')
+CHUNK_LENGTH = struct.Struct('!I')
+
+# Seconds a completed or failed download stays queryable before it is dropped
+DOWNLOAD_RETENTION = 3600
+
+# Oldest finished downloads are evicted once this many are tracked
+MAX_TRACKED_DOWNLOADS = 10_000
+
+# Default SO_SNDBUF/SO_RCVBUF for WebSocket connections
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+
+# WebSocket message size limit when the client doesn't ask for one, and the
+# most a client may ask for via the max_msg_size query parameter
+DEFAULT_MAX_MSG_SIZE = 16 * 1024 * 1024
+MAX_MSG_SIZE_LIMIT = 64 * 1024 * 1024
+
+
+def json_dumps(obj) -> str:
+    """Serialize WebSocket control messages with orjson"""
+    return orjson.dumps(obj).decode()
+
+
+def write_all(fd: int, data: memoryview, offset: int):
+    """Write all of data to fd at offset, retrying on short writes"""
+    while data:
+        written = os.pwrite(fd, data, offset)
+        data = data[written:]
+        offset += written
+
+
+def tune_socket(sock, nodelay: bool, bufsize: int):
+    """Apply TCP tuning to a connection's socket"""
+    if sock is None:
+        return
+    
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(nodelay))
+    
+    # Larger kernel buffers keep high bandwidth-delay links full (0 keeps the OS default,
+    # which also leaves Linux buffer autotuning on)
+    if bufsize:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, bufsize)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, bufsize)
+    
+    # Linux only: ACK incoming data immediately instead of delaying it
+    # (not sticky; the kernel may drop back to delayed ACKs later)
+    if hasattr(socket, 'TCP_QUICKACK'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+
+def preallocate(fd: int, size: int):
+    """Reserve size bytes for fd up front so chunk writes don't extend the file"""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # Filesystem doesn't support it
+    
+    # Fall back to setting the final size (e.g. on macOS/Windows)
+    os.ftruncate(fd, size)
+
 
 class FileDownloadServer:
-    def __init__(self, host='0.0.0.0', port=8080, download_dir='./downloads'):
+    def __init__(self, host='0.0.0.0', port=8080, download_dir='./downloads', compress=True,
+                 nodelay=True, sndbuf=SOCKET_BUFFER_SIZE):
         self.host = host
         self.port = port
+        self.compress = compress  # Accept permessage-deflate when a client offers it
+        self.nodelay = nodelay  # Disable Nagle on WebSocket connections
+        self.sndbuf = sndbuf  # Socket send/receive buffer size in bytes
         self.download_dir = Path(download_dir)
         self.download_dir.mkdir(exist_ok=True)
         
         # Track connected clients: {client_id: websocket}
         self.connected_clients: Dict[str, web.WebSocketResponse] = {}
         
-        # Track ongoing downloads: {download_id: {status, file_path, etc}}
-        self.downloads: Dict[str, dict] = {}
+        # Track downloads: {download_id: {status, file_path, etc}}
+        # Finished entries are moved to the end, so the oldest finished come first
+        self.downloads: OrderedDict[str, dict] = collections.OrderedDict()
+        
+        # Output files held open for the lifetime of a download: {download_id: fd}
+        self.download_fds: Dict[str, int] = {}
+        
+        # Control connection each open download was requested over: {download_id: websocket}
+        self.download_connections: Dict[str, web.WebSocketResponse] = {}
+        
+        # Batch writes still running in the threadpool: {fd: count}. A closed download's fd
+        # is only closed once these finish, so a late pwrite can't hit a reused descriptor
+        self.fd_writes: Dict[int, int] = {}
+        self.fds_to_close = set()
+        
+        # Batches written ahead of the contiguous bytes_received mark: {download_id: {offset: end}}
+        self.pending_ranges: Dict[str, Dict[int, int]] = {}
+        
+        # Small threadpool for disk writes so they don't block the event loop
+        self.io_executor = ThreadPoolExecutor(max_workers=4)
+        
+        # Control message dispatch: {message type: handler(data, ws)}
+        self.message_handlers = {
+            'register': self.handle_register,
+            'ping_bulk': self.handle_ping_bulk,
+            'download_meta': self.handle_download_meta,
+            'file_complete': self.handle_file_complete,
+            'error': self.handle_client_error
+        }
         
         self.app = web.Application()
         self.setup_routes()
@@ -38,6 +144,7 @@ class FileDownloadServer:
         self.app.router.add_get('/ws', self.websocket_handler)
         self.app.router.add_post('/api/download', self.trigger_download)
         self.app.router.add_get('/api/downloads/{download_id}', self.get_download_status)
+        self.app.router.add_delete('/api/downloads', self.cleanup_downloads)
         self.app.router.add_get('/api/clients', self.list_clients)
         self.app.router.add_get('/health', self.health_check)
     
@@ -63,92 +170,371 @@ class FileDownloadServer:
     
     async def websocket_handler(self, request):
         """Handle WebSocket connections from clients"""
-        # Increase max message size to handle large file chunks (1MB chunks = ~1.33MB when JSON encoded)
-        # Using 16MB to be safe and allow for JSON overhead
-        ws = web.WebSocketResponse(heartbeat=30, max_msg_size=16*1024*1024)
+        # Size the message limit for the client's batches (8MB by default), within a server-side cap
+        try:
+            max_msg_size = int(request.query.get('max_msg_size', DEFAULT_MAX_MSG_SIZE))
+        except ValueError:
+            max_msg_size = DEFAULT_MAX_MSG_SIZE
+        max_msg_size = min(max(max_msg_size, DEFAULT_MAX_MSG_SIZE), MAX_MSG_SIZE_LIMIT)
+        
+        ws = web.WebSocketResponse(heartbeat=30, max_msg_size=max_msg_size, compress=self.compress)
         await ws.prepare(request)
+        tune_socket(request.transport.get_extra_info('socket'), self.nodelay, self.sndbuf)
         
         client_id = None
         
         try:
             async for msg in ws:
                 if msg.type == aiohttp.WSMsgType.TEXT:
-                    data = json.loads(msg.data)
-                    msg_type = data.get('type')
+                    data = orjson.loads(msg.data)
+                    handler = self.message_handlers.get(data.get('type'))
                     
-                    if msg_type == 'register':
-                        client_id = data.get('client_id')
-                        self.connected_clients[client_id] = ws
-                        print(f"✓ Client registered: {client_id}")
-                        await ws.send_json({
-                            'type': 'registered',
-                            'message': 'Successfully registered'
-                        })
-                    
-                    elif msg_type == 'file_chunk':
-                        await self.handle_file_chunk(data)
-                    
-                    elif msg_type == 'file_complete':
-                        await self.handle_file_complete(data)
-                    
-                    elif msg_type == 'error':
-                        await self.handle_client_error(data)
+                    if handler:
+                        # Only register returns a value: the client to clean up after on disconnect
+                        registered = await handler(data, ws)
+                        if registered:
+                            client_id = registered
+                
+                elif msg.type == aiohttp.WSMsgType.BINARY:
+                    await self.handle_file_chunk(msg.data)
                 
                 elif msg.type == aiohttp.WSMsgType.ERROR:
                     print(f'WebSocket error: {ws.exception()}')
         
         finally:
-            if client_id and client_id in self.connected_clients:
+            # A stale connection with the same client_id (e.g. half-open after a reconnect)
+            # must not unregister the live one
+            if client_id and self.connected_clients.get(client_id) is ws:
                 del self.connected_clients[client_id]
                 print(f"✗ Client disconnected: {client_id}")
+            
+            # Fail transfers this connection can no longer finish; they can be resumed later
+            for download_id in list(self.download_fds):
+                if self.download_connections.get(download_id) is ws:
+                    download_info = self.downloads[download_id]
+                    self.close_download_file(download_id)
+                    download_info['status'] = 'failed'
+                    download_info['error'] = 'Client disconnected'
+                    self.schedule_expiry(download_id)
         
         return ws
     
-    async def handle_file_chunk(self, data):
-        """Handle incoming file chunk from client"""
+    async def handle_register(self, data, ws):
+        """Handle client registration, returning the client_id for control connections"""
+        client_id = None
+        
+        if data.get('stream_role') == 'data':
+            # Extra connection carrying chunk batches for an already registered client
+            print(f"✓ Data stream registered for client: {data.get('parent_id')}")
+        else:
+            client_id = data.get('client_id')
+            self.connected_clients[client_id] = ws
+            print(f"✓ Client registered: {client_id}")
+        
+        await ws.send_json({
+            'type': 'registered',
+            'message': 'Successfully registered'
+        }, dumps=json_dumps)
+        
+        return client_id
+    
+    async def handle_ping_bulk(self, data, ws):
+        """Handle a bandwidth probe: acknowledge once received so the client can time it"""
+        await ws.send_json({
+            'type': 'pong_bulk',
+            'size': len(data.get('padding', ''))
+        }, dumps=json_dumps)
+    
+    async def handle_download_meta(self, data, ws):
+        """Handle file metadata sent before the binary chunk stream.
+        
+        Replies with resume_from: the byte offset the client should start sending
+        from. This is the full size when an identical file was already downloaded,
+        or the end of the contiguous data of an earlier failed transfer.
+        """
         download_id = data.get('download_id')
-        chunk_data = data.get('data')
-        chunk_num = data.get('chunk_num')
+        size = data.get('size')
+        chunk_size = data.get('chunk_size')
+        file_hash = data.get('hash')
+        
+        if download_id not in self.downloads:
+            # e.g. evicted or cleaned up; answer so the client fails now instead of timing out
+            await self.send_resume_from(ws, download_id, error='Unknown download')
+            return
+        
+        download_info = self.downloads[download_id]
+        download_info['total_chunks'] = data.get('total_chunks')
+        download_info['hash'] = file_hash
+        download_info['mtime'] = data.get('mtime')
+        offset = 0
+        
+        duplicate = self.find_duplicate(file_hash, size)
+        if duplicate:
+            # Same content already on disk; point at it instead of transferring again
+            self.discard_download_file(download_id)
+            download_info['file_path'] = duplicate['file_path']
+            download_info['deduplicated_from'] = duplicate['download_id']
+            download_info['chunks_received'] = download_info['total_chunks']
+            offset = size
+            print(f"  Duplicate of download {duplicate['download_id']}, skipping transfer")
+        
+        else:
+            partial = self.find_partial(download_info['client_id'], file_hash)
+            if partial and chunk_size:
+                # Only resume on a chunk boundary so chunk numbering stays consistent
+                offset = partial['bytes_received'] - partial['bytes_received'] % chunk_size
+            
+            if offset:
+                self.discard_download_file(download_id)
+                self.download_fds[download_id] = os.open(partial['file_path'], os.O_WRONLY)
+                self.download_connections[download_id] = ws
+                download_info['file_path'] = partial['file_path']
+                download_info['resumed_from'] = partial['download_id']
+                download_info['chunks_received'] = offset // chunk_size
+                partial['resumed_by'] = download_id
+                print(f"  Resuming download {partial['download_id']} from byte {offset:,}")
+            
+            fd = self.download_fds.get(download_id)
+            if fd is not None and size:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self.io_executor, preallocate, fd, size)
+        
+        download_info['bytes_received'] = offset
+        
+        await self.send_resume_from(ws, download_id, offset)
+    
+    async def send_resume_from(self, ws, download_id, offset=None, missing=None, error=None):
+        """Tell the client the byte offset to send from, or why the download can't continue"""
+        reply = {'type': 'resume_from', 'download_id': download_id}
+        if error:
+            reply['error'] = error
+        else:
+            reply['offset'] = offset
+            if missing:
+                reply['missing'] = missing
+        
+        await ws.send_json(reply, dumps=json_dumps)
+    
+    def find_duplicate(self, file_hash, size):
+        """Find a completed download with the same content that is still on disk"""
+        if not file_hash:
+            return None
+        
+        for download_info in self.downloads.values():
+            if (download_info['status'] == 'completed' and download_info.get('hash') == file_hash
+                    and download_info.get('total_size') == size
+                    and os.path.exists(download_info['file_path'])):
+                return download_info
+        
+        return None
+    
+    def find_partial(self, client_id, file_hash):
+        """Find the most recent failed download of the same file from this client"""
+        if not file_hash:
+            return None
+        
+        for download_info in reversed(list(self.downloads.values())):
+            if (download_info['status'] == 'failed' and download_info['client_id'] == client_id
+                    and download_info.get('hash') == file_hash
+                    and download_info.get('bytes_received') and 'resumed_by' not in download_info
+                    and os.path.exists(download_info['file_path'])):
+                return download_info
+        
+        return None
+    
+    async def handle_file_chunk(self, frame: bytes):
+        """Handle incoming batch of binary file chunks from client"""
+        if len(frame) < BATCH_HEADER.size:
+            print(f"Warning: Received truncated chunk frame ({len(frame)} bytes)")
+            return
+        
+        download_id_bytes, first_chunk, _total_chunks, count, offset = BATCH_HEADER.unpack_from(frame)
+        download_id = str(uuid.UUID(bytes=download_id_bytes))
         
         if download_id not in self.downloads:
             print(f"Warning: Received chunk for unknown download {download_id}")
             return
         
+        # Skip the per-chunk length table; the chunk bytes follow it contiguously
+        payload_start = BATCH_HEADER.size + count * CHUNK_LENGTH.size
+        if len(frame) < payload_start:
+            print(f"Warning: Malformed chunk batch for download {download_id}")
+            return
+        
+        # Unpack the whole table in one struct call rather than a Python-level loop
+        payload = memoryview(frame)[payload_start:]
+        expected = sum(struct.unpack_from(f'!{count}I', frame, BATCH_HEADER.size))
+        
+        if len(payload) != expected:
+            print(f"Warning: Malformed chunk batch for download {download_id}")
+            return
+        
+        fd = self.download_fds.get(download_id)
+        if fd is None:
+            print(f"Warning: Received chunk for closed download {download_id}")
+            return
+        
+        # Write the whole batch at its offset; batches from parallel streams may arrive out of order
+        await self.write_batch(fd, payload, offset)
+        
+        if self.download_fds.get(download_id) != fd:
+            # Closed while this batch was being written, e.g. the client disconnected
+            return
+        
         download_info = self.downloads[download_id]
-        file_path = download_info['file_path']
+        download_info['chunks_received'] += count
+        print(f"  Chunks {first_chunk}-{first_chunk + count - 1} received for download {download_id}")
         
-        # Append chunk to file
-        with open(file_path, 'ab') as f:
-            f.write(chunk_data.encode('latin1'))  # Preserve binary encoding
+        # Advance the contiguous mark used for resuming past any batches now joined up
+        ranges = self.pending_ranges.setdefault(download_id, {})
+        ranges[offset] = offset + len(payload)
+        while download_info['bytes_received'] in ranges:
+            download_info['bytes_received'] = ranges.pop(download_info['bytes_received'])
         
-        download_info['chunks_received'] = chunk_num
-        print(f"  Chunk {chunk_num} received for download {download_id}")
+        self.finish_download(download_id)
     
-    async def handle_file_complete(self, data):
-        """Handle file download completion"""
+    async def write_batch(self, fd: int, payload: memoryview, offset: int):
+        """Write a batch in the threadpool, keeping fd open until the write has finished"""
+        loop = asyncio.get_running_loop()
+        self.fd_writes[fd] = self.fd_writes.get(fd, 0) + 1
+        
+        # Release from the worker's own future: cancelling the awaiting task doesn't stop the thread
+        future = self.io_executor.submit(write_all, fd, payload, offset)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release_fd, fd))
+        await asyncio.wrap_future(future)
+    
+    def release_fd(self, fd: int):
+        """Finish one in-flight write on fd, closing it if its download was closed meanwhile"""
+        self.fd_writes[fd] -= 1
+        if not self.fd_writes[fd]:
+            del self.fd_writes[fd]
+            if fd in self.fds_to_close:
+                self.fds_to_close.discard(fd)
+                os.close(fd)
+    
+    async def handle_file_complete(self, data, ws):
+        """Handle file download completion.
+        
+        Replies with resume_from: the full size once every byte has arrived, otherwise
+        the first missing offset and the byte ranges the client must re-send (batches
+        lost with a dropped data stream).
+        """
         download_id = data.get('download_id')
-        total_size = data.get('total_size')
         
-        if download_id in self.downloads:
-            download_info = self.downloads[download_id]
-            download_info['status'] = 'completed'
-            download_info['completed_at'] = datetime.utcnow().isoformat()
-            download_info['total_size'] = total_size
-            
-            print(f"✓ Download completed: {download_id}")
-            print(f"  File saved to: {download_info['file_path']}")
-            print(f"  Size: {total_size:,} bytes")
+        if download_id not in self.downloads:
+            await self.send_resume_from(ws, download_id, error='Unknown download')
+            return
+        
+        download_info = self.downloads[download_id]
+        download_info['total_size'] = data.get('total_size')
+        download_info['total_chunks'] = data.get('total_chunks')
+        self.finish_download(download_id)
+        
+        if download_info['status'] == 'completed':
+            await self.send_resume_from(ws, download_id, download_info['total_size'])
+        
+        elif download_info['status'] == 'downloading':
+            missing = self.missing_ranges(download_id)
+            print(f"  Download {download_id} is missing {len(missing)} range(s) "
+                  f"from byte {missing[0][0]:,}, requesting re-send")
+            await self.send_resume_from(ws, download_id, missing[0][0], missing=missing)
+        
+        else:
+            await self.send_resume_from(ws, download_id, error=download_info.get('error', 'Download failed'))
     
-    async def handle_client_error(self, data):
+    def missing_ranges(self, download_id):
+        """List the [start, end) byte ranges of a download that have not been written yet"""
+        download_info = self.downloads[download_id]
+        ranges = self.pending_ranges.get(download_id, {})
+        missing = []
+        
+        position = download_info['bytes_received']
+        for start in sorted(ranges):
+            if start > position:
+                missing.append([position, start])
+            position = max(position, ranges[start])
+        
+        if position < download_info['total_size']:
+            missing.append([position, download_info['total_size']])
+        
+        return missing
+    
+    def finish_download(self, download_id):
+        """Mark a download completed once file_complete and all its bytes have arrived"""
+        download_info = self.downloads[download_id]
+        
+        if (download_info['status'] != 'downloading' or 'total_size' not in download_info
+                or download_info['bytes_received'] < download_info['total_size']):
+            return
+        
+        # Trim any preallocated space beyond what was actually sent
+        total_size = download_info['total_size']
+        fd = self.download_fds.get(download_id)
+        if fd is not None:
+            os.ftruncate(fd, total_size)
+        self.close_download_file(download_id)
+        
+        download_info['status'] = 'completed'
+        download_info['completed_at'] = datetime.utcnow().isoformat()
+        self.schedule_expiry(download_id)
+        
+        print(f"✓ Download completed: {download_id}")
+        print(f"  File saved to: {download_info['file_path']}")
+        print(f"  Size: {total_size:,} bytes")
+    
+    async def handle_client_error(self, data, ws):
         """Handle error from client"""
         download_id = data.get('download_id')
         error_msg = data.get('message')
         
+        self.close_download_file(download_id)
+        
         if download_id in self.downloads:
             self.downloads[download_id]['status'] = 'failed'
             self.downloads[download_id]['error'] = error_msg
+            self.schedule_expiry(download_id)
             print(f"✗ Download failed: {download_id} - {error_msg}")
     
+    def schedule_expiry(self, download_id):
+        """Move a finished download to the eviction end and drop it after DOWNLOAD_RETENTION"""
+        self.downloads.move_to_end(download_id)
+        loop = asyncio.get_running_loop()
+        loop.call_later(DOWNLOAD_RETENTION, self.expire_download, download_id)
+    
+    def expire_download(self, download_id):
+        """Forget a download unless it is still in progress"""
+        download_info = self.downloads.get(download_id)
+        if download_info and download_info['status'] != 'downloading':
+            del self.downloads[download_id]
+    
+    def evict_downloads(self):
+        """Drop the oldest finished downloads while more than MAX_TRACKED_DOWNLOADS are tracked"""
+        for download_id in list(self.downloads):
+            if len(self.downloads) < MAX_TRACKED_DOWNLOADS:
+                break
+            self.expire_download(download_id)
+    
+    def close_download_file(self, download_id):
+        """Close the output file of a download if it is still open"""
+        self.pending_ranges.pop(download_id, None)
+        self.download_connections.pop(download_id, None)
+        fd = self.download_fds.pop(download_id, None)
+        if fd is None:
+            return
+        
+        if fd in self.fd_writes:
+            self.fds_to_close.add(fd)  # Closed by release_fd after the last write
+        else:
+            os.close(fd)
+    
+    def discard_download_file(self, download_id):
+        """Close and delete the (still empty) output file of a download"""
+        self.close_download_file(download_id)
+        try:
+            os.remove(self.downloads[download_id]['file_path'])
+        except FileNotFoundError:
+            pass
+    
     async def trigger_download(self, request):
         """API endpoint to trigger file download from a client"""
         try:
@@ -168,6 +554,9 @@ class FileDownloadServer:
                     status=404
                 )
             
+            # Make room before tracking another download
+            self.evict_downloads()
+            
             # Generate download ID
             download_id = str(uuid.uuid4())
             
@@ -182,16 +571,29 @@ class FileDownloadServer:
                 'remote_path': file_path,
                 'status': 'downloading',
                 'started_at': datetime.utcnow().isoformat(),
-                'chunks_received': 0
+                'chunks_received': 0,
+                'bytes_received': 0
             }
+            self.download_fds[download_id] = os.open(
+                str(local_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644
+            )
             
             # Send download command to client
             ws = self.connected_clients[client_id]
-            await ws.send_json({
-                'type': 'download_request',
-                'download_id': download_id,
-                'file_path': file_path
-            })
+            self.download_connections[download_id] = ws
+            try:
+                await ws.send_json({
+                    'type': 'download_request',
+                    'download_id': download_id,
+                    'file_path': file_path
+                }, dumps=json_dumps)
+            except Exception as e:
+                # The client never got the request, so nothing will ever finish this download
+                self.close_download_file(download_id)
+                self.downloads[download_id]['status'] = 'failed'
+                self.downloads[download_id]['error'] = f'Failed to send download request: {e}'
+                self.schedule_expiry(download_id)
+                raise
             
             print(f"→ Download request sent to {client_id}")
             print(f"  Download ID: {download_id}")
@@ -220,6 +622,17 @@ class FileDownloadServer:
         
         return web.json_response(self.downloads[download_id])
     
+    async def cleanup_downloads(self, request):
+        """Forget all completed and failed downloads"""
+        finished = [
+            download_id for download_id, download_info in self.downloads.items()
+            if download_info['status'] != 'downloading'
+        ]
+        for download_id in finished:
+            del self.downloads[download_id]
+        
+        return web.json_response({'removed': len(finished)})
+    
     def run(self):
         """Start the server"""
         print(f"Starting File Download Server on {self.host}:{self.port}")
@@ -229,9 +642,11 @@ class FileDownloadServer:
         print(f"  API: http://{self.host}:{self.port}/api/download")
         print(f"  Status: http://{self.host}:{self.port}/api/downloads/{{download_id}}")
         print(f"  Clients: http://{self.host}:{self.port}/api/clients")
+        print(f"  Event loop: {'uvloop' if uvloop else 'asyncio'}")
         print(f"\nWaiting for clients to connect...")
         
-        web.run_app(self.app, host=self.host, port=self.port)
+        loop = uvloop.new_event_loop() if uvloop else None
+        web.run_app(self.app, host=self.host, port=self.port, loop=loop)
 
 
 async def cli_trigger_download(server_url: str, client_id: str, file_path: str = '$HOME/file_to_download.txt'):
@@ -302,6 +717,16 @@ def main():
     server_parser.add_argument('--host', default='0.0.0.0', help='Server host')
     server_parser.add_argument('--port', type=int, default=8080, help='Server port')
     server_parser.add_argument('--download-dir', default='./downloads', help='Download directory')
+    server_parser.add_argument('--compress', dest='compress', action='store_true', default=True,
+                               help='Accept permessage-deflate from clients (default)')
+    server_parser.add_argument('--no-compress', dest='compress', action='store_false',
+                               help='Refuse permessage-deflate from clients')
+    server_parser.add_argument('--nodelay', dest='nodelay', action='store_true', default=True,
+                               help='Set TCP_NODELAY on WebSocket connections (default)')
+    server_parser.add_argument('--no-nodelay', dest='nodelay', action='store_false',
+                               help="Leave Nagle's algorithm enabled")
+    server_parser.add_argument('--sndbuf', type=int, default=SOCKET_BUFFER_SIZE,
+                               help='Socket send/receive buffer size in bytes, 0 for the OS default (default: 4MB)')
     
     # Download command
     download_parser = subparsers.add_parser('download', help='Trigger a download')
@@ -315,7 +740,10 @@ def main():
         server = FileDownloadServer(
             host=args.host,
             port=args.port,
-            download_dir=args.download_dir
+            download_dir=args.download_dir,
+            compress=args.compress,
+            nodelay=args.nodelay,
+            sndbuf=args.sndbuf
         )
         server.run()
     